@@ -3,7 +3,23 @@ Banking API Client Package.
 
 A library to consume the Banking API.
 """
-from .banking_api_client import BankingAPIClient, BankingDataCollector
+from .banking_api_client import (
+    BankingAPIClient,
+    BankingAPIClientAsync,
+    BankingAPIClientSync,
+    BankingDataCollector,
+    BankingDataCollectorAsync,
+    BankingDataCollectorSync,
+    DEFAULT_TOKEN_CACHE_DIR,
+)
 
-__all__ = ["BankingAPIClient", "BankingDataCollector"]
+__all__ = [
+    "BankingAPIClient",
+    "BankingAPIClientAsync",
+    "BankingAPIClientSync",
+    "BankingDataCollector",
+    "BankingDataCollectorAsync",
+    "BankingDataCollectorSync",
+    "DEFAULT_TOKEN_CACHE_DIR",
+]
 __version__ = "0.1.0"
@@ -3,17 +3,86 @@ Banking API Client
 
 A library to consume the banking API available at https://dsp2-technical-test.iliad78.net
 """
-import aiohttp
+from __future__ import annotations
+
 import asyncio
+import concurrent.futures
+import hashlib
+import os
+import threading
+import time
+import urllib.parse
 import requests
-from typing import Dict, List, Optional, Union, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Union, Any
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Decoder for response bodies, orjson when it is installed
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps_stdlib(obj: Any) -> bytes:
+    """Encode an object as UTF-8 JSON with the json module, like orjson.dumps."""
+    return json.dumps(obj).encode("utf-8")
+
+
+# Encoder for the token cache, orjson when it is installed
+_json_dumps = orjson.dumps if orjson is not None else _json_dumps_stdlib
+
+
+# Default location for the on-disk token cache
+DEFAULT_TOKEN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "banking_api_client")
+
+# Cached tokens closer than this many seconds to expiry are not reused
+TOKEN_EXPIRY_MARGIN = 30
+
+# Seconds the async client waits for the optional warm-up request
+WARM_UP_TIMEOUT = 5
+
+# Connections kept per host by the sync session, and the most threads the sync
+# collector uses so that none of them waits for or discards a connection
+POOL_MAXSIZE = 32
+
 
 class BankingAPIClient:
-    """Client for interacting with the Banking API."""
+    """
+    Client for interacting with the Banking API.
+    
+    Instantiating BankingAPIClient returns a BankingAPIClientSync, or a
+    BankingAPIClientAsync when use_async is True.
+    """
+    
+    __slots__ = (
+        "base_url", "username", "password", "session",
+        "token", "token_type", "token_expires_at", "token_cache_dir", "warm_up",
+        "_headers", "_headers_token", "_headers_token_type", "_identity", "_identity_token",
+        "_auth_lock", "_auth_lock_loop", "_auth_body", "_auth_headers",
+        "_url_auth", "_url_identity", "_url_accounts",
+        "_url_account_tmpl", "_url_balance_tmpl", "_url_tx_tmpl"
+    )
+    
+    use_async = False
+    
+    def __new__(cls, base_url: str, username: str, password: str, use_async: bool = False,
+                token_cache_dir: Optional[str] = None, warm_up: bool = False):
+        """Select the sync or async client class."""
+        if cls is BankingAPIClient:
+            cls = BankingAPIClientAsync if use_async else BankingAPIClientSync
+        return super().__new__(cls)
     
-    def __init__(self, base_url: str, username: str, password: str, use_async: bool = False):
+    def __init__(self, base_url: str, username: str, password: str, use_async: bool = False,
+                 token_cache_dir: Optional[str] = None, warm_up: bool = False):
         """
         Initialize the Banking API client.
         
@@ -21,92 +90,143 @@ class BankingAPIClient:
             base_url: Base URL of the API
             username: Username for authentication
             password: Password for authentication
-            use_async: Whether to use async client (default: False)
+            use_async: Whether to use async client (default: False), only used
+                when instantiating BankingAPIClient itself
+            token_cache_dir: Directory where access tokens are cached between
+                client instances, e.g. DEFAULT_TOKEN_CACHE_DIR (default: None, no caching)
+            warm_up: Whether the async client opens a connection to the API when entering
+                its context, so that the first request does not pay for DNS and TLS
+                (default: False)
         """
         self.base_url = base_url.rstrip('/')
+        # Endpoint URLs, formatted once per client
+        self._url_auth = f"{self.base_url}/oauth/token"
+        self._url_identity = f"{self.base_url}/stet/identity"
+        self._url_accounts = f"{self.base_url}/stet/account"
+        # Percent signs of the base URL are escaped in the %-format templates
+        url_prefix = self.base_url.replace("%", "%%")
+        self._url_account_tmpl = url_prefix + "/stet/account/%s"
+        self._url_balance_tmpl = url_prefix + "/stet/account/%s/balance"
+        self._url_tx_tmpl = url_prefix + "/stet/account/%s/transaction"
         self.username = username
         self.password = password
-        self.use_async = use_async
+        # Token request body, encoded once since the credentials never change
+        self._auth_body = urllib.parse.urlencode({
+            "username": username,
+            "password": password,
+            "scope": "stet"
+        }).encode("ascii")
+        self._auth_headers = {"Content-Type": "application/x-www-form-urlencoded"}
         self.session = None
         self.token = None
         self.token_type = "bearer"  # Default value
+        self.token_expires_at = None
+        self.token_cache_dir = token_cache_dir
+        self.warm_up = warm_up
+        self._headers = None
+        # Token and token type the cached headers were built from
+        self._headers_token = None
+        self._headers_token_type = None
+        # Identity of the authenticated user and the token it was fetched with
+        self._identity = None
+        self._identity_token = None
+        # Serializes re-authentication after a rejected token, an asyncio.Lock
+        # created for each event loop it is used in for the async client
+        self._auth_lock = None if self.use_async else threading.Lock()
+        self._auth_lock_loop = None
     
-    def __enter__(self):
-        """Context manager entry."""
-        if not self.use_async:
-            self.session = requests.Session()
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit."""
-        if self.session and not self.use_async:
-            self.session.close()
-    
-    async def __aenter__(self):
-        """Async context manager entry."""
-        if self.use_async:
-            self.session = aiohttp.ClientSession()
-        return self
-    
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit."""
-        if self.session and self.use_async:
-            await self.session.close()
-        
-    def authenticate(self) -> str:
+    def _token_cache_path(self) -> Optional[str]:
         """
-        Authenticate with the API and get token.
+        Get the token cache file for this user and API.
         
         Returns:
-            Authentication token
+            Path of the cache file, or None if token caching is disabled
         """
-        if self.use_async:
-            raise RuntimeError("Use authenticate_async for async mode")
-        
-        auth_url = f"{self.base_url}/oauth/token"
-        auth_data = {
-            "username": self.username,
-            "password": self.password,
-            "scope": "stet"
-        }
+        if not self.token_cache_dir:
+            return None
+        key = hashlib.sha256(f"{self.base_url}|{self.username}".encode()).hexdigest()
+        return os.path.join(self.token_cache_dir, f"{key}.json")
+    
+    def _load_cached_token(self) -> bool:
+        """
+        Load a still valid token from the token cache.
         
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        response = self.session.post(auth_url, data=auth_data, headers=headers)
-        response.raise_for_status()
+        Returns:
+            True if a cached token was loaded
+        """
+        path = self._token_cache_path()
+        if path is None:
+            return False
+        
+        try:
+            with open(path, "rb") as f:
+                cached = _json_loads(f.read())
+            token = cached["access_token"]
+            token_type = cached["token_type"]
+            expires_at = float(cached["expires_at"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+        
+        if expires_at - time.time() <= TOKEN_EXPIRY_MARGIN:
+            return False
+        
+        self.token = token
+        self.token_type = token_type
+        self.token_expires_at = expires_at
+        self._cache_headers()
+        return True
+    
+    def _store_token(self, data: Dict[str, Any]) -> None:
+        """
+        Store the token from an authentication response and cache it.
         
-        data = response.json()
+        Args:
+            data: Decoded response of the token endpoint
+        """
         # Stockage de l'access_token et du token_type
         self.token = data.get("access_token")
         self.token_type = data.get("token_type", "bearer")
-        return self.token
+        self.token_expires_at = time.time() + float(data.get("expires_in", 3600))
+        self._cache_headers()
         
-    async def authenticate_async(self) -> str:
+        path = self._token_cache_path()
+        if path is None:
+            return
+        
+        cached = {
+            "access_token": self.token,
+            "token_type": self.token_type,
+            "expires_at": self.token_expires_at
+        }
+        # The cache is best effort: failing to write it must not fail authentication
+        try:
+            os.makedirs(self.token_cache_dir, mode=0o700, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                # os.open only sets the mode of a new file
+                os.chmod(path, 0o600)
+                f.write(_json_dumps(cached))
+        except OSError:
+            pass
+    
+    def _build_headers(self) -> Dict[str, str]:
         """
-        Authenticate with the API asynchronously and get token.
+        Build headers for API requests from the current token.
         
         Returns:
-            Authentication token
+            Dictionary of headers
         """
-        if not self.use_async:
-            raise RuntimeError("Use authenticate for sync mode")
-        
-        auth_url = f"{self.base_url}/oauth/token"
-        auth_data = {
-            "username": self.username,
-            "password": self.password,
-            "scope": "stet"
+        return {
+            "Authorization": f"{self.token_type} {self.token}",
+            "Content-Type": "application/json"
         }
-        
-        
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        async with self.session.post(auth_url, data=auth_data, headers=headers) as response:
-            response.raise_for_status()
-            data = await response.json()
-            # Stockage de l'access_token et du token_type
-            self.token = data.get("access_token")
-            self.token_type = data.get("token_type", "bearer")
-            return self.token
-        
+    
+    def _cache_headers(self) -> None:
+        """Build the headers for the current token and keep them for the next requests."""
+        self._headers = self._build_headers()
+        self._headers_token = self.token
+        self._headers_token_type = self.token_type
+    
     def _get_headers(self) -> Dict[str, str]:
         """
         Get headers for API requests.
@@ -117,75 +237,153 @@ class BankingAPIClient:
         if not self.token:
             raise ValueError("Not authenticated. Call authenticate() first")
         
+        # Cached when a token is stored; rebuilt if the token was set directly. An
+        # identity check is enough since an equal but distinct token only costs a rebuild
+        if self.token is not self._headers_token or self.token_type is not self._headers_token_type:
+            self._cache_headers()
+        return self._headers
+
+
+class BankingAPIClientSync(BankingAPIClient):
+    """Synchronous client for interacting with the Banking API."""
+    
+    __slots__ = ()
+    
+    use_async = False
+    
+    def __enter__(self):
+        """Context manager entry."""
+        self.session = requests.Session()
+        # Keep a pool of reusable connections to the API host and retry
+        # requests that fail because of a transient gateway error. The last
+        # response is returned once retries run out, so that it still raises
+        # an HTTPError rather than a RetryError
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=retries)
+        self.session.mount("https://", adapter)
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        if self.session:
+            self.session.close()
+    
+    def authenticate(self) -> str:
+        """
+        Authenticate with the API and get token.
         
-        token_type = getattr(self, "token_type", "bearer")
-        
-        return {
-            "Authorization": f"{token_type} {self.token}",
-            "Content-Type": "application/json"
-        }
-        
-    def get_identity(self) -> Dict[str, Any]:
+        Returns:
+            Authentication token
         """
-        Get user identity information.
+        if self._load_cached_token():
+            return self.token
+        return self._request_token()
+    
+    def _request_token(self) -> str:
+        """
+        Get a new token from the token endpoint.
         
         Returns:
-            Dictionary containing identity information
+            Authentication token
         """
-        if self.use_async:
-            raise RuntimeError("Use get_identity_async for async mode")
+        response = self.session.post(self._url_auth, data=self._auth_body, headers=self._auth_headers)
+        if response.status_code >= 400:
+            response.raise_for_status()
         
+        self._store_token(_json_loads(response.content))
+        return self.token
+    
+    def _reauthenticate(self, rejected_token: Optional[str]) -> None:
+        """
+        Replace a token rejected by the API.
         
-        url = f"{self.base_url}/stet/identity"
-        response = self.session.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        Concurrent callers rejected with the same token share a single token request.
         
-    async def get_identity_async(self) -> Dict[str, Any]:
+        Args:
+            rejected_token: Token sent with the rejected request
+        """
+        with self._auth_lock:
+            # Another thread already replaced it
+            if self.token != rejected_token:
+                return
+            if self._load_cached_token() and self.token != rejected_token:
+                return
+            self._request_token()
+    
+    def _get_json(self, url: str) -> Any:
         """
-        Get user identity information asynchronously.
+        Perform an authenticated GET request.
         
-        Returns:
-            Dictionary containing identity information
-        """
-        if not self.use_async:
-            raise RuntimeError("Use get_identity for sync mode")
+        The request is retried once with a new token if the current one is rejected.
         
+        Args:
+            url: Request URL
         
-        url = f"{self.base_url}/stet/identity"
-        async with self.session.get(url, headers=self._get_headers()) as response:
+        Returns:
+            Decoded JSON response
+        """
+        token = self.token
+        response = self.session.get(url, headers=self._get_headers())
+        if response.status_code == 401:
+            self._reauthenticate(token)
+            response = self.session.get(url, headers=self._get_headers())
+        if response.status_code >= 400:
             response.raise_for_status()
-            return await response.json()
+        return _json_loads(response.content)
     
-    def get_accounts(self) -> List[Dict[str, Any]]:
+    def _iter_json_items(self, url: str) -> Iterator[Any]:
         """
-        Get all accounts.
+        Perform an authenticated GET request and stream the items of the JSON array it returns.
         
-        Returns:
-            List of accounts
+        Args:
+            url: Request URL
+        
+        Yields:
+            Decoded array items
+        """
+        token = self.token
+        response = self.session.get(url, headers=self._get_headers(), stream=True)
+        if response.status_code == 401:
+            response.close()
+            self._reauthenticate(token)
+            response = self.session.get(url, headers=self._get_headers(), stream=True)
+        with response:
+            if response.status_code >= 400:
+                response.raise_for_status()
+            # Let urllib3 undo any gzip/deflate content encoding
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, "item", use_float=True)
+    
+    def get_identity(self) -> Dict[str, Any]:
         """
-        if self.use_async:
-            raise RuntimeError("Use get_accounts_async for async mode")
+        Get user identity information.
         
-        url = f"{self.base_url}/stet/account"
-        response = self.session.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        The identity is fetched once per token.
+        
+        Returns:
+            Dictionary containing identity information, a copy that the caller may modify
+        """
+        if self._identity is None or self._identity_token != self.token:
+            self._identity = self._get_json(self._url_identity)
+            # The token the request ended with, it may have been replaced after a 401
+            self._identity_token = self.token
+        return dict(self._identity)
     
-    async def get_accounts_async(self) -> List[Dict[str, Any]]:
+    def get_accounts(self) -> List[Dict[str, Any]]:
         """
-        Get all accounts asynchronously.
+        Get all accounts.
         
         Returns:
             List of accounts
         """
-        if not self.use_async:
-            raise RuntimeError("Use get_accounts for sync mode")
-        
-        url = f"{self.base_url}/stet/account"
-        async with self.session.get(url, headers=self._get_headers()) as response:
-            response.raise_for_status()
-            return await response.json()
+        url = self._url_accounts
+        return self._get_json(url)
     
     def get_account(self, account_id: str) -> Dict[str, Any]:
         """
@@ -197,118 +395,294 @@ class BankingAPIClient:
         Returns:
             Account details
         """
-        if self.use_async:
-            raise RuntimeError("Use get_account_async for async mode")
-        
-        url = f"{self.base_url}/stet/account/{account_id}"
-        response = self.session.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        url = self._url_account_tmpl % account_id
+        return self._get_json(url)
     
-    async def get_account_async(self, account_id: str) -> Dict[str, Any]:
+    def get_balances(self, account_id: str) -> Dict[str, Any]:
         """
-        Get specific account by ID asynchronously.
+        Get balances for an account.
         
         Args:
             account_id: Account ID
         
         Returns:
-            Account details
+            Account balances
         """
-        if not self.use_async:
-            raise RuntimeError("Use get_account for sync mode")
-        
-        url = f"{self.base_url}/stet/account/{account_id}"
-        async with self.session.get(url, headers=self._get_headers()) as response:
-            response.raise_for_status()
-            return await response.json()
+        url = self._url_balance_tmpl % account_id
+        return self._get_json(url)
     
-    def get_balances(self, account_id: str) -> Dict[str, Any]:
+    def get_transactions(self, account_id: str, stream: bool = False
+                         ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
-        Get balances for an account.
+        Get transactions for an account.
         
         Args:
             account_id: Account ID
+            stream: Whether to return an iterator that decodes the transactions while
+                they are received, instead of a list (requires ijson, default: False)
         
         Returns:
-            Account balances
+            List of transactions, or an iterator over them when streaming
+        """
+        url = self._url_tx_tmpl % account_id
+        if stream:
+            if ijson is None:
+                raise ImportError("Streaming transactions requires the ijson package")
+            return self._iter_json_items(url)
+        return self._get_json(url)
+
+
+class BankingAPIClientAsync(BankingAPIClient):
+    """Asynchronous client for interacting with the Banking API."""
+    
+    __slots__ = ()
+    
+    use_async = True
+    
+    async def __aenter__(self):
+        """Async context manager entry."""
+        # Imported here so that sync-only users do not pay for importing aiohttp
+        import aiohttp
+        
+        # Keep connections to the API host alive between requests
+        connector = aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=16,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(connector=connector)
+        if self.warm_up:
+            # __aexit__ does not run when entering fails, close the session here
+            try:
+                await self._warm_up_async()
+            except BaseException:
+                await self.session.close()
+                raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        if self.session:
+            await self.session.close()
+    
+    async def _warm_up_async(self) -> None:
+        """Open a pooled connection to the API host ahead of the first request."""
+        import aiohttp
+        
+        # Any response will do: only the resolved address and the TLS connection are kept.
+        # Failing or timing out only leaves the first request on a cold connection
+        try:
+            async with self.session.head(self.base_url + "/", allow_redirects=False,
+                                         timeout=aiohttp.ClientTimeout(total=WARM_UP_TIMEOUT)):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+    
+    async def authenticate_async(self) -> str:
+        """
+        Authenticate with the API asynchronously and get token.
+        
+        Returns:
+            Authentication token
         """
-        if self.use_async:
-            raise RuntimeError("Use get_balances_async for async mode")
+        if self._load_cached_token():
+            return self.token
+        return await self._request_token_async()
+    
+    async def _request_token_async(self) -> str:
+        """
+        Get a new token from the token endpoint asynchronously.
         
-        url = f"{self.base_url}/stet/account/{account_id}/balance"
-        response = self.session.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        Returns:
+            Authentication token
+        """
+        async with self.session.post(self._url_auth, data=self._auth_body, headers=self._auth_headers) as response:
+            if response.status >= 400:
+                response.raise_for_status()
+            self._store_token(_json_loads(await response.read()))
+            return self.token
     
-    async def get_balances_async(self, account_id: str) -> Dict[str, Any]:
+    async def _reauthenticate_async(self, rejected_token: Optional[str]) -> None:
         """
-        Get balances for an account asynchronously.
+        Replace a token rejected by the API asynchronously.
+        
+        Concurrent callers rejected with the same token share a single token request.
         
         Args:
-            account_id: Account ID
+            rejected_token: Token sent with the rejected request
+        """
+        # Created per event loop since it binds to the loop that first waits on it
+        loop = asyncio.get_running_loop()
+        if self._auth_lock_loop is not loop:
+            self._auth_lock = asyncio.Lock()
+            self._auth_lock_loop = loop
+        async with self._auth_lock:
+            # Another task already replaced it
+            if self.token != rejected_token:
+                return
+            if self._load_cached_token() and self.token != rejected_token:
+                return
+            await self._request_token_async()
+    
+    async def _get_json_async(self, url: str) -> Any:
+        """
+        Perform an authenticated GET request asynchronously.
+        
+        The request is retried once with a new token if the current one is rejected.
+        
+        Args:
+            url: Request URL
         
         Returns:
-            Account balances
+            Decoded JSON response
         """
-        if not self.use_async:
-            raise RuntimeError("Use get_balances for sync mode")
+        token = self.token
+        async with self.session.get(url, headers=self._get_headers()) as response:
+            if response.status != 401:
+                if response.status >= 400:
+                    response.raise_for_status()
+                return _json_loads(await response.read())
         
-        url = f"{self.base_url}/stet/account/{account_id}/balance"
+        await self._reauthenticate_async(token)
         async with self.session.get(url, headers=self._get_headers()) as response:
-            response.raise_for_status()
-            return await response.json()
+            if response.status >= 400:
+                response.raise_for_status()
+            return _json_loads(await response.read())
     
-    def get_transactions(self, account_id: str) -> List[Dict[str, Any]]:
+    async def _iter_json_items_async(self, url: str) -> AsyncIterator[Any]:
         """
-        Get transactions for an account.
+        Perform an authenticated GET request asynchronously and stream the items of the
+        JSON array it returns.
         
         Args:
-            account_id: Account ID
+            url: Request URL
+        
+        Yields:
+            Decoded array items
+        """
+        token = self.token
+        async with self.session.get(url, headers=self._get_headers()) as response:
+            if response.status != 401:
+                if response.status >= 400:
+                    response.raise_for_status()
+                async for item in ijson.items_async(response.content, "item", use_float=True):
+                    yield item
+                return
+        
+        await self._reauthenticate_async(token)
+        async with self.session.get(url, headers=self._get_headers()) as response:
+            if response.status >= 400:
+                response.raise_for_status()
+            async for item in ijson.items_async(response.content, "item", use_float=True):
+                yield item
+    
+    async def get_identity_async(self) -> Dict[str, Any]:
+        """
+        Get user identity information asynchronously.
+        
+        The identity is fetched once per token.
         
         Returns:
-            List of transactions
+            Dictionary containing identity information, a copy that the caller may modify
+        """
+        if self._identity is None or self._identity_token != self.token:
+            self._identity = await self._get_json_async(self._url_identity)
+            # The token the request ended with, it may have been replaced after a 401
+            self._identity_token = self.token
+        return dict(self._identity)
+    
+    async def get_accounts_async(self) -> List[Dict[str, Any]]:
         """
-        if self.use_async:
-            raise RuntimeError("Use get_transactions_async for async mode")
+        Get all accounts asynchronously.
         
-        url = f"{self.base_url}/stet/account/{account_id}/transaction"
-        response = self.session.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        Returns:
+            List of accounts
+        """
+        url = self._url_accounts
+        return await self._get_json_async(url)
     
-    async def get_transactions_async(self, account_id: str) -> List[Dict[str, Any]]:
+    async def get_account_async(self, account_id: str) -> Dict[str, Any]:
         """
-        Get transactions for an account asynchronously.
+        Get specific account by ID asynchronously.
         
         Args:
             account_id: Account ID
         
         Returns:
-            List of transactions
+            Account details
+        """
+        url = self._url_account_tmpl % account_id
+        return await self._get_json_async(url)
+    
+    async def get_balances_async(self, account_id: str) -> Dict[str, Any]:
         """
-        if not self.use_async:
-            raise RuntimeError("Use get_transactions for sync mode")
+        Get balances for an account asynchronously.
         
-        url = f"{self.base_url}/stet/account/{account_id}/transaction"
-        async with self.session.get(url, headers=self._get_headers()) as response:
-            response.raise_for_status()
-            return await response.json()
+        Args:
+            account_id: Account ID
+        
+        Returns:
+            Account balances
+        """
+        url = self._url_balance_tmpl % account_id
+        return await self._get_json_async(url)
     
-
+    async def get_transactions_async(self, account_id: str, stream: bool = False
+                                     ) -> Union[List[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]:
+        """
+        Get transactions for an account asynchronously.
+        
+        Args:
+            account_id: Account ID
+            stream: Whether to return an async iterator that decodes the transactions
+                while they are received, instead of a list (requires ijson, default: False)
+        
+        Returns:
+            List of transactions, or an async iterator over them when streaming
+        """
+        url = self._url_tx_tmpl % account_id
+        if stream:
+            if ijson is None:
+                raise ImportError("Streaming transactions requires the ijson package")
+            return self._iter_json_items_async(url)
+        return await self._get_json_async(url)
 
 
 class BankingDataCollector:
-    """Utility for collecting all data from the Banking API."""
+    """
+    Utility for collecting all data from the Banking API.
+    
+    Instantiating BankingDataCollector returns a BankingDataCollectorSync, or a
+    BankingDataCollectorAsync for an async client.
+    """
     
-    def __init__(self, client: BankingAPIClient):
+    __slots__ = ("client", "max_concurrency")
+    
+    def __new__(cls, client: BankingAPIClient, max_concurrency: int = 64):
+        """Select the sync or async collector class matching the client."""
+        if cls is BankingDataCollector:
+            cls = BankingDataCollectorAsync if client.use_async else BankingDataCollectorSync
+        return super().__new__(cls)
+    
+    def __init__(self, client: BankingAPIClient, max_concurrency: int = 64):
         """
         Initialize the data collector.
         
         Args:
             client: Authenticated BankingAPIClient instance
+            max_concurrency: Maximum number of in-flight account requests, capped at
+                POOL_MAXSIZE threads with a sync client (default: 64)
         """
         self.client = client
+        self.max_concurrency = max_concurrency
+
+
+class BankingDataCollectorSync(BankingDataCollector):
+    """Utility for collecting all data from the Banking API with a sync client."""
+    
+    __slots__ = ()
     
     def collect_all_data(self) -> Dict[str, Any]:
         """
@@ -317,25 +691,65 @@ class BankingDataCollector:
         Returns:
             Dictionary containing all data (identity, accounts, balances, transactions)
         """
-        if self.client.use_async:
-            raise RuntimeError("Use collect_all_data_async for async mode")
-        
         # Get identity
         identity = self.client.get_identity()
         
         # Get accounts
         accounts = self.client.get_accounts()
         
-        # Get balances and transactions for each account
-        for account in accounts:
-            account_id = account.get("id")
-            account["balances"] = self.client.get_balances(account_id)
-            account["transactions"] = self.client.get_transactions(account_id)
+        # Get balances and transactions for every account from a thread pool
+        account_ids = [account["id"] for account in accounts]
+        # No more threads than pooled connections, so that each reuses one
+        max_workers = min(self.max_concurrency, POOL_MAXSIZE)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            balances = executor.map(self.client.get_balances, account_ids)
+            transactions = executor.map(self.client.get_transactions, account_ids)
+            for account, account_balances, account_transactions in zip(accounts, balances, transactions):
+                account["balances"] = account_balances
+                account["transactions"] = account_transactions
         
         return {
             "identity": identity,
             "accounts": accounts
         }
+
+
+class BankingDataCollectorAsync(BankingDataCollector):
+    """Utility for collecting all data from the Banking API with an async client."""
+    
+    __slots__ = ()
+    
+    async def _limited(self, semaphore: asyncio.Semaphore, fetch, account_id: str) -> Any:
+        """
+        Fetch account data while holding the concurrency semaphore.
+        
+        The request coroutine is only created once the semaphore is acquired, so that
+        requests cancelled while waiting leave no coroutine behind.
+        
+        Args:
+            semaphore: Semaphore bounding the in-flight requests
+            fetch: Client method to call with the account ID
+            account_id: Account ID
+        
+        Returns:
+            Result of the request
+        """
+        async with semaphore:
+            return await fetch(account_id)
+    
+    async def _enrich(self, account: Dict[str, Any], semaphore: asyncio.Semaphore) -> None:
+        """
+        Add the balances and transactions of an account to it.
+        
+        Args:
+            account: Account returned by the API, updated in place
+            semaphore: Semaphore bounding the in-flight requests
+        """
+        account_id = account["id"]
+        account["balances"], account["transactions"] = await asyncio.gather(
+            self._limited(semaphore, self.client.get_balances_async, account_id),
+            self._limited(semaphore, self.client.get_transactions_async, account_id)
+        )
     
     async def collect_all_data_async(self) -> Dict[str, Any]:
         """
@@ -344,24 +758,18 @@ class BankingDataCollector:
         Returns:
             Dictionary containing all data (identity, accounts, balances, transactions)
         """
-        if not self.client.use_async:
-            raise RuntimeError("Use collect_all_data for sync mode")
-        
-        # Get identity
-        identity = await self.client.get_identity_async()
+        # Get identity and accounts concurrently
+        identity, accounts = await asyncio.gather(
+            self.client.get_identity_async(),
+            self.client.get_accounts_async()
+        )
         
-        # Get accounts
-        accounts = await self.client.get_accounts_async()
-        
-
-        for account in accounts:
-            account_id = account.get("id")
-            # Get balances and transactions sequentially for each account
-            account["balances"] = await self.client.get_balances_async(account_id)
-            account["transactions"] = await self.client.get_transactions_async(account_id)
+        # Get balances and transactions for every account concurrently. The semaphore
+        # is created per call since it binds to the event loop that first waits on it
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        await asyncio.gather(*(self._enrich(account, semaphore) for account in accounts))
         
         return {
             "identity": identity,
             "accounts": accounts
         }
-    
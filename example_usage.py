@@ -3,8 +3,34 @@ Example usage of the Banking API Client with proper UTF-8 handling.
 """
 import asyncio
 import json
+import sys
 from banking_api_client import BankingAPIClient, BankingDataCollector
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def print_json(data):
+    """Pretty print data as UTF-8 JSON."""
+    if orjson is None:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    sys.stdout.buffer.flush()
+
+
+def save_json(data, path):
+    """Save data to a file as UTF-8 JSON."""
+    if orjson is None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
 
 def sync_example():
     """Example of using the client in synchronous mode."""
@@ -24,11 +50,10 @@ def sync_example():
         data = collector.collect_all_data()
         
         # Pretty print the data with proper UTF-8 handling
-        print(json.dumps(data, indent=2, ensure_ascii=False)) 
+        print_json(data)
         
         # Save to file with proper UTF-8 handling
-        with open("banking_data_sync.json", "w", encoding="utf-8") as f:  
-            json.dump(data, f, indent=2, ensure_ascii=False) 
+        save_json(data, "banking_data_sync.json")
         
         print("Data saved to banking_data_sync.json")
 
@@ -51,11 +76,10 @@ async def async_example():
         data = await collector.collect_all_data_async()
         
         # Pretty print the data with proper UTF-8 handling
-        print(json.dumps(data, indent=2, ensure_ascii=False)) 
+        print_json(data)
         
         # Save to file with proper UTF-8 handling
-        with open("banking_data_async.json", "w", encoding="utf-8") as f:  
-            json.dump(data, f, indent=2, ensure_ascii=False) 
+        save_json(data, "banking_data_async.json")
         
         print("Data saved to banking_data_async.json")
 
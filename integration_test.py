@@ -4,10 +4,11 @@ Integration test for the Banking API Client.
 This test will make actual API calls to the server.
 """
 import asyncio
-import json
+import concurrent.futures
 import sys
 import os
-from banking_api_client import BankingAPIClient, BankingDataCollector
+from banking_api_client import BankingAPIClient, BankingDataCollector, DEFAULT_TOKEN_CACHE_DIR, POOL_MAXSIZE
+from example_usage import save_json
 
 
 def test_sync_client():
@@ -19,7 +20,7 @@ def test_sync_client():
     password = "111111"
     
     # Use as context manager
-    with BankingAPIClient(base_url, username, password) as client:
+    with BankingAPIClient(base_url, username, password, token_cache_dir=DEFAULT_TOKEN_CACHE_DIR) as client:
         try:
             # Authenticate
             token = client.authenticate()
@@ -39,21 +40,22 @@ def test_sync_client():
             accounts = client.get_accounts()
             print(f"Found {len(accounts)} accounts:")
             
-            for account in accounts:
+            # Get balances and transactions for every account from a thread pool
+            account_ids = [account.get("id") for account in accounts]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=POOL_MAXSIZE) as executor:
+                all_balances = list(executor.map(client.get_balances, account_ids))
+                all_transactions = list(executor.map(client.get_transactions, account_ids))
+            
+            for account, balances, transactions in zip(accounts, all_balances, all_transactions):
                 account_id = account.get("id")
                 print(f"  Account: {account.get('name')} ({account_id})")
                 
-                # Get balances
-                balances = client.get_balances(account_id)
-                
                 if isinstance(balances, list) and balances:
                     balance = balances[0]  
                     print(f"    Balance: {balance.get('amount')} {balance.get('currency')}")
                 else:
                     print(f"    Balance: {balances}")
                 
-                # Get transactions
-                transactions = client.get_transactions(account_id)
                 print(f"    Transactions: {len(transactions)}")
                 
                 
@@ -78,14 +80,18 @@ async def test_async_client():
     password = "222222"
     
     # Use as async context manager
-    async with BankingAPIClient(base_url, username, password, use_async=True) as client:
+    async with BankingAPIClient(base_url, username, password, use_async=True,
+                                token_cache_dir=DEFAULT_TOKEN_CACHE_DIR) as client:
         try:
             # Authenticate
             token = await client.authenticate_async()
             print(f"Authentication successful: {token[:10]}...")
             
-            # Get identity
-            identity = await client.get_identity_async()
+            # Get identity and accounts concurrently
+            identity, accounts = await asyncio.gather(
+                client.get_identity_async(),
+                client.get_accounts_async()
+            )
             
             first_name = identity.get('first_name', '')
             last_name = identity.get('last_name', '')
@@ -94,8 +100,6 @@ async def test_async_client():
             print(f"Identity: {full_name} ({identity.get('id')})")
             print(f"Date of birth: {identity.get('date_of_birth', 'N/A')}")
             
-            # Get accounts
-            accounts = await client.get_accounts_async()
             print(f"Found {len(accounts)} accounts:")
             
             for account in accounts:
@@ -138,7 +142,7 @@ async def test_data_collector():
     password = "111111"
     
     # Use as context manager
-    with BankingAPIClient(base_url, username, password) as client:
+    with BankingAPIClient(base_url, username, password, token_cache_dir=DEFAULT_TOKEN_CACHE_DIR) as client:
         try:
             # Authenticate
             client.authenticate()
@@ -150,8 +154,7 @@ async def test_data_collector():
             data = collector.collect_all_data()
             
            
-            with open("banking_data_sync.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            save_json(data, "banking_data_sync.json")
             
             print(f"Synchronous data collector test passed! Data saved to banking_data_sync.json")
             
@@ -171,7 +174,8 @@ async def test_data_collector():
     password = "222222"
     
     # Use as async context manager
-    async with BankingAPIClient(base_url, username, password, use_async=True) as client:
+    async with BankingAPIClient(base_url, username, password, use_async=True,
+                                token_cache_dir=DEFAULT_TOKEN_CACHE_DIR) as client:
         try:
             # Authenticate
             await client.authenticate_async()
@@ -183,8 +187,7 @@ async def test_data_collector():
             data = await collector.collect_all_data_async()
             
             
-            with open("banking_data_async.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            save_json(data, "banking_data_async.json")
             
             print(f"Asynchronous data collector test passed! Data saved to banking_data_async.json")
             
@@ -6,8 +6,13 @@ setup(
     packages=find_packages(),
     install_requires=[
         "requests>=2.25.0",
+        "urllib3>=1.26.0",
         "aiohttp>=3.7.0",
     ],
+    extras_require={
+        "fast": ["orjson>=3.0", "aiohttp[speedups]"],
+        "stream": ["ijson>=3.1"],
+    },
     python_requires=">=3.7",
     author="Boumediene MAROUF ",
     author_email="boumedienemar@gmail.com",
@@ -2,297 +2,719 @@
 Tests for the Banking API Client.
 """
 import unittest
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import call, patch, MagicMock, AsyncMock
 import asyncio
-import aiohttp
+import concurrent.futures
+import contextlib
+import http.server
+import importlib.util
+import io
 import json
-from banking_api_client import BankingAPIClient, BankingDataCollector
+import os
+from types import MappingProxyType
+import tempfile
+import threading
+import requests
+import sys
+from banking_api_client import (
+    BankingAPIClient,
+    BankingAPIClientAsync,
+    BankingAPIClientSync,
+    BankingDataCollector,
+    BankingDataCollectorAsync,
+    BankingDataCollectorSync,
+    POOL_MAXSIZE,
+    TOKEN_EXPIRY_MARGIN,
+    WARM_UP_TIMEOUT,
+    _json_dumps_stdlib,
+)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Run the async tests on uvloop when it is available
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# Headers the client is expected to send with the fixture token
+_EXPECTED_HEADERS = {"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+class _FakeResponse:
+    """Minimal stand-in for a requests or aiohttp response with a JSON body."""
+    
+    def __init__(self, payload=None, status=200):
+        self.content = json.dumps(payload, default=dict).encode()
+        self.status_code = status
+        self.status = status
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+    
+    async def read(self):
+        return self.content
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+class _TrackedResponse:
+    """Wrapper that yields to the event loop before returning a response, like a real request.
+    
+    When given an events list, it records ("start", url) when the request is sent
+    and ("end", url) when the response is released.
+    """
+    
+    def __init__(self, response, url=None, events=None):
+        self.response = response
+        self.url = url
+        self.events = events
+    
+    async def __aenter__(self):
+        if self.events is not None:
+            self.events.append(("start", self.url))
+        await asyncio.sleep(0)
+        return self.response
+    
+    async def __aexit__(self, *exc_info):
+        if self.events is not None:
+            self.events.append(("end", self.url))
+
+
+def _build_url_map(base_url, identity, accounts, balances, transactions):
+    """Map the URL of every endpoint used by the data collector to its response."""
+    url_map = {
+        f"{base_url}/stet/identity": _FakeResponse(identity),
+        f"{base_url}/stet/account": _FakeResponse(accounts),
+    }
+    balances_response = _FakeResponse(balances)
+    transactions_response = _FakeResponse(transactions)
+    for account in accounts:
+        url_map[f"{base_url}/stet/account/{account['id']}/balance"] = balances_response
+        url_map[f"{base_url}/stet/account/{account['id']}/transaction"] = transactions_response
+    return url_map
 
 
 class TestBankingAPIClient(unittest.TestCase):
     """Tests for the BankingAPIClient class."""
     
+    base_url = "https://dsp2-technical-test.iliad78.net"
+    username = "mdupuis"
+    password = "111111"
+    
+    # Sample response data, read-only so that no test can alter it for the others
+    TOKEN_DATA = MappingProxyType({
+        "access_token": "fake-token-12345",
+        "token_type": "bearer"
+    })
+    IDENTITY_DATA = MappingProxyType({
+        "id": "user_TIMLjQYdrPd07YVuuLdK3Dvw",
+        "prefix": "MIST",
+        "first_name": "Maurice",
+        "last_name": "Dupuis",
+        "date_of_birth": "1970-05-06"
+    })
+    ACCOUNTS_DATA = (
+        MappingProxyType({
+            "id": "acct_Ms99YLcC2LETpC4KKK7VcjPY",
+            "name": "Compte Carte",
+            "type": "CACC",
+            "usage": "PRIV",
+            "iban": "FR7610096000505687604467V48",
+            "currency": "EUR"
+        }),
+        MappingProxyType({
+            "id": "acct_ruguKBdKe3Tr3e3iLsPwieqB",
+            "name": "Compte Courant",
+            "type": "CACC",
+            "usage": "PRIV",
+            "iban": "FR7610096000501234567890123",
+            "currency": "EUR"
+        })
+    )
+    BALANCES_DATA = (
+        MappingProxyType({
+            "amount": 66871,
+            "currency": "EUR"
+        }),
+    )
+    TRANSACTIONS_DATA = (
+        MappingProxyType({
+            "id": "tx123",
+            "amount": 100.50,
+            "currency": "EUR",
+            "description": "Supermarket",
+            "date": "2023-01-01T10:00:00Z"
+        }),
+        MappingProxyType({
+            "id": "tx456",
+            "amount": -50.25,
+            "currency": "EUR",
+            "description": "ATM Withdrawal",
+            "date": "2023-01-02T14:30:00Z"
+        })
+    )
+    
+    @classmethod
+    def setUpClass(cls):
+        """Build the responses of the data collector tests once for the class."""
+        super().setUpClass()
+        cls._URL_MAP = _build_url_map(cls.base_url, cls.IDENTITY_DATA, cls.ACCOUNTS_DATA,
+                                      cls.BALANCES_DATA, cls.TRANSACTIONS_DATA)
+    
     def setUp(self):
-        """Set up test fixtures."""
-        self.base_url = "https://dsp2-technical-test.iliad78.net"
-        self.username = "mdupuis"
-        self.password = "111111"
-        
-        # Sample response data
-        self.token_data = {
-            "access_token": "fake-token-12345",
-            "token_type": "bearer"
-        }
-        self.identity_data = {
-            "id": "user_TIMLjQYdrPd07YVuuLdK3Dvw",
-            "prefix": "MIST",
-            "first_name": "Maurice",
-            "last_name": "Dupuis",
-            "date_of_birth": "1970-05-06"
-        }
-        self.accounts_data = [
-            {
-                "id": "acct_Ms99YLcC2LETpC4KKK7VcjPY",
-                "name": "Compte Carte",
-                "type": "CACC",
-                "usage": "PRIV",
-                "iban": "FR7610096000505687604467V48",
-                "currency": "EUR"
-            },
-            {
-                "id": "acct_ruguKBdKe3Tr3e3iLsPwieqB",
-                "name": "Compte Courant",
-                "type": "CACC",
-                "usage": "PRIV",
-                "iban": "FR7610096000501234567890123",
-                "currency": "EUR"
-            }
-        ]
-        self.balances_data = [
-            {
-                "amount": 66871,
-                "currency": "EUR"
-            }
-        ]
-        self.transactions_data = [
-            {
-                "id": "tx123",
-                "amount": 100.50,
-                "currency": "EUR",
-                "description": "Supermarket",
-                "date": "2023-01-01T10:00:00Z"
-            },
-            {
-                "id": "tx456",
-                "amount": -50.25,
-                "currency": "EUR",
-                "description": "ATM Withdrawal",
-                "date": "2023-01-02T14:30:00Z"
-            }
-        ]
+        """Set up a client authenticated with a fake token."""
+        # requests.Session is patched for every test of the class
+        session_patcher = patch('requests.Session')
+        self.mock_session = session_patcher.start()
+        self.addCleanup(session_patcher.stop)
+        
+        self.client = BankingAPIClient(self.base_url, self.username, self.password)
+        self.client.session = self.mock_session.return_value
+        self.client._store_token(self.TOKEN_DATA)
     
-    @patch('requests.Session')
-    def test_authenticate(self, mock_session):
+    def test_client_and_collector_classes(self):
+        """Test that the sync or async implementation is selected."""
+        client = BankingAPIClient(self.base_url, self.username, self.password)
+        async_client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
+
+        # Assertions
+        self.assertIsInstance(client, BankingAPIClientSync)
+        self.assertIsInstance(async_client, BankingAPIClientAsync)
+        self.assertIsInstance(BankingDataCollector(client), BankingDataCollectorSync)
+        self.assertIsInstance(BankingDataCollector(async_client), BankingDataCollectorAsync)
+
+    def test_authenticate(self):
         """Test authentication."""
         # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.token_data
-        mock_session.return_value.post.return_value = mock_response
+        self.mock_session.return_value.post.return_value = _FakeResponse(self.TOKEN_DATA)
         
         client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
+        client.session = self.mock_session.return_value
         
         token = client.authenticate()
         
         # Assertions
         self.assertEqual(token, "fake-token-12345")
-        mock_session.return_value.post.assert_called_once_with(
+        self.mock_session.return_value.post.assert_called_once_with(
             f"{self.base_url}/oauth/token",
-            data={"username": self.username, "password": self.password, "scope": "stet"},
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
+            data=f"username={self.username}&password={self.password}&scope=stet".encode(),
+            headers=_FORM_HEADERS
         )
-    
-    @patch('requests.Session')
-    def test_get_identity(self, mock_session):
-        """Test getting identity."""
+
+    def test_headers_cached_after_authenticate(self):
+        """Test that request headers are built once per token."""
         # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.identity_data
-        mock_session.return_value.get.return_value = mock_response
-        
+        self.mock_session.return_value.post.return_value = _FakeResponse(self.TOKEN_DATA)
+
         client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
-        
+        client.session = self.mock_session.return_value
+        client.authenticate()
+
+        # Assertions
+        headers = client._get_headers()
+        self.assertIs(client._get_headers(), headers)
+        self.assertEqual(
+            headers,
+            _EXPECTED_HEADERS
+        )
+
+    def test_headers_follow_token_reassignment(self):
+        """Test that the headers are rebuilt when the token is set directly."""
+        client = BankingAPIClient(self.base_url, self.username, self.password)
+        client.token = "first"
+        client._get_headers()
+        client.token = "second"
+
+        # Assertions
+        self.assertEqual(client._get_headers()["Authorization"], "bearer second")
+
+    def test_token_is_cached(self):
+        """Test that the token is reused across requests to different endpoints."""
+        # Mock responses
+        url_map = self._URL_MAP
+        self.mock_session.return_value.post.return_value = _FakeResponse(self.TOKEN_DATA)
+        self.mock_session.return_value.get.side_effect = lambda url, headers: url_map[url]
+
+        client = BankingAPIClient(self.base_url, self.username, self.password)
+        client.session = self.mock_session.return_value
+        client.authenticate()
         identity = client.get_identity()
-        
+        accounts = client.get_accounts()
+
         # Assertions
-        self.assertEqual(identity, self.identity_data)
-        mock_session.return_value.get.assert_called_once_with(
+        self.assertEqual(identity, self.IDENTITY_DATA)
+        self.assertEqual(accounts, list(self.ACCOUNTS_DATA))
+        self.mock_session.return_value.post.assert_called_once_with(
+            f"{self.base_url}/oauth/token",
+            data=f"username={self.username}&password={self.password}&scope=stet".encode(),
+            headers=_FORM_HEADERS
+        )
+        self.assertEqual(self.mock_session.return_value.get.call_args_list, [
+            call(f"{self.base_url}/stet/identity", headers=_EXPECTED_HEADERS),
+            call(f"{self.base_url}/stet/account", headers=_EXPECTED_HEADERS)
+        ])
+
+    def _authenticate_twice(self):
+        """Authenticate a client, then a second client sharing its token cache directory."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            clients = []
+            for _ in range(2):
+                client = BankingAPIClient(self.base_url, self.username, self.password,
+                                          token_cache_dir=cache_dir)
+                client.session = self.mock_session.return_value
+                client.authenticate()
+                clients.append(client)
+        return clients
+
+    def test_authenticate_uses_token_cache(self):
+        """Test that a cached token is reused by a new client, with either JSON encoder."""
+        # Mock response
+        self.mock_session.return_value.post.return_value = _FakeResponse(dict(self.TOKEN_DATA, expires_in=3600))
+
+        encoders = [
+            ("default", contextlib.nullcontext()),
+            ("json fallback", patch.multiple("banking_api_client", _json_loads=json.loads,
+                                             _json_dumps=_json_dumps_stdlib)),
+        ]
+        for name, encoder_patch in encoders:
+            with self.subTest(encoder=name), encoder_patch:
+                self.mock_session.return_value.post.reset_mock()
+
+                client, other_client = self._authenticate_twice()
+
+                # Assertions
+                self.assertEqual(other_client.token, "fake-token-12345")
+                self.assertEqual(other_client.token_type, "bearer")
+                self.assertEqual(other_client.token_expires_at, client.token_expires_at)
+                self.mock_session.return_value.post.assert_called_once()
+
+    def test_authenticate_ignores_expiring_cached_token(self):
+        """Test that a cached token about to expire is replaced by a new one."""
+        # Mock response
+        self.mock_session.return_value.post.return_value = _FakeResponse(
+            dict(self.TOKEN_DATA, expires_in=TOKEN_EXPIRY_MARGIN - 1)
+        )
+
+        self._authenticate_twice()
+
+        # Assertions
+        self.assertEqual(self.mock_session.return_value.post.call_count, 2)
+
+    @unittest.skipIf(os.name == "nt", "POSIX file modes are not available")
+    def test_token_cache_file_is_private(self):
+        """Test that the token cache file is only readable by its owner."""
+        # Mock response
+        self.mock_session.return_value.post.return_value = _FakeResponse(self.TOKEN_DATA)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = BankingAPIClient(self.base_url, self.username, self.password,
+                                      token_cache_dir=cache_dir)
+            client.session = self.mock_session.return_value
+            client.authenticate()
+
+            # Assertions
+            mode = os.stat(client._token_cache_path()).st_mode
+            self.assertEqual(mode & 0o777, 0o600)
+
+    def test_get_reauthenticates_on_401(self):
+        """Test that a rejected token is refreshed and the request retried."""
+        # Mock responses
+        self.mock_session.return_value.post.return_value = _FakeResponse(
+            {"access_token": "new-token", "token_type": "bearer"}
+        )
+        self.mock_session.return_value.get.side_effect = [
+            _FakeResponse(status=401),
+            _FakeResponse(self.IDENTITY_DATA)
+        ]
+
+        client = self.client
+
+        identity = client.get_identity()
+
+        # Assertions
+        self.assertEqual(identity, self.IDENTITY_DATA)
+        self.mock_session.return_value.post.assert_called_once()
+        self.mock_session.return_value.get.assert_called_with(
             f"{self.base_url}/stet/identity",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers={"Authorization": "bearer new-token", "Content-Type": "application/json"}
         )
+
+    def test_concurrent_401s_share_one_token_request(self):
+        """Test that requests rejected together trigger a single token request."""
+        # Mock responses
+        self.mock_session.return_value.post.return_value = _FakeResponse(
+            {"access_token": "new-token", "token_type": "bearer"}
+        )
+        url_map = self._URL_MAP
+        # Hold the account requests until they have all been sent with the old token
+        barrier = threading.Barrier(2 * len(self.ACCOUNTS_DATA), timeout=5)
+        
+        def side_effect(url, headers):
+            if headers == _EXPECTED_HEADERS and "/stet/account/" in url:
+                barrier.wait()
+                return _FakeResponse(status=401)
+            return url_map[url]
+        
+        self.mock_session.return_value.get.side_effect = side_effect
+        
+        collector = BankingDataCollector(self.client)
+        data = collector.collect_all_data()
+        
+        # Assertions
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        self.mock_session.return_value.post.assert_called_once()
+        self.assertEqual(self.client.token, "new-token")
+    
+    def test_get_raises_on_error_status(self):
+        """Test that an error response raises an HTTPError."""
+        # Mock response
+        self.mock_session.return_value.get.return_value = _FakeResponse(status=500)
+
+        client = self.client
+
+        # Assertions
+        with self.assertRaises(requests.HTTPError):
+            client.get_identity()
+
+    def test_simple_gets(self):
+        """Test the endpoints returning a decoded JSON body."""
+        account_id = "acct_Ms99YLcC2LETpC4KKK7VcjPY"
+        cases = [
+            ("get_identity", (), f"{self.base_url}/stet/identity", self.IDENTITY_DATA),
+            ("get_accounts", (), f"{self.base_url}/stet/account", list(self.ACCOUNTS_DATA)),
+            ("get_balances", (account_id,),
+             f"{self.base_url}/stet/account/{account_id}/balance", list(self.BALANCES_DATA)),
+            ("get_transactions", (account_id,),
+             f"{self.base_url}/stet/account/{account_id}/transaction", list(self.TRANSACTIONS_DATA)),
+        ]
+        
+        client = self.client
+        
+        for name, args, expected_url, expected_payload in cases:
+            with self.subTest(endpoint=name):
+                self.mock_session.return_value.get.reset_mock()
+                # Mock response
+                self.mock_session.return_value.get.return_value = _FakeResponse(expected_payload)
+                
+                result = getattr(client, name)(*args)
+                
+                # Assertions
+                self.assertEqual(result, expected_payload)
+                self.mock_session.return_value.get.assert_called_once_with(
+                    expected_url,
+                    headers=_EXPECTED_HEADERS
+                )
     
-    @patch('requests.Session')
-    def test_get_accounts(self, mock_session):
-        """Test getting accounts."""
+    def test_base_url_with_percent_sign(self):
+        """Test that a percent-encoded base URL is kept as is in the account URLs."""
         # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.accounts_data
-        mock_session.return_value.get.return_value = mock_response
+        self.mock_session.return_value.get.return_value = _FakeResponse(self.BALANCES_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = BankingAPIClient("https://example.com/api%20v1", self.username, self.password)
+        client.session = self.mock_session.return_value
+        client._store_token(self.TOKEN_DATA)
         
-        accounts = client.get_accounts()
+        client.get_balances("acct_123")
         
         # Assertions
-        self.assertEqual(accounts, self.accounts_data)
-        mock_session.return_value.get.assert_called_once_with(
-            f"{self.base_url}/stet/account",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+        self.mock_session.return_value.get.assert_called_once_with(
+            "https://example.com/api%20v1/stet/account/acct_123/balance",
+            headers=_EXPECTED_HEADERS
         )
     
-    @patch('requests.Session')
-    def test_get_balances(self, mock_session):
-        """Test getting balances."""
-        # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.balances_data
-        mock_session.return_value.get.return_value = mock_response
+    def test_get_identity_is_memoized(self):
+        """Test that the identity is fetched once per token and returned as a copy."""
+        # Mock responses
+        self.mock_session.return_value.post.return_value = _FakeResponse(
+            {"access_token": "new-token", "token_type": "bearer"}
+        )
+        self.mock_session.return_value.get.return_value = _FakeResponse(self.IDENTITY_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
-        balances = client.get_balances("acct_Ms99YLcC2LETpC4KKK7VcjPY")
+        client.get_identity()["first_name"] = "Changed"
+        identity = client.get_identity()
         
         # Assertions
-        self.assertEqual(balances, self.balances_data)
-        mock_session.return_value.get.assert_called_once_with(
-            f"{self.base_url}/stet/account/acct_Ms99YLcC2LETpC4KKK7VcjPY/balance",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
-        )
+        self.assertEqual(identity, self.IDENTITY_DATA)
+        self.assertEqual(self.mock_session.return_value.get.call_count, 1)
+        
+        # A new token invalidates the identity
+        client.authenticate()
+        client.get_identity()
+        self.assertEqual(self.mock_session.return_value.get.call_count, 2)
     
-    @patch('requests.Session')
-    def test_get_transactions(self, mock_session):
-        """Test getting transactions."""
-        # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.transactions_data
-        mock_session.return_value.get.return_value = mock_response
+    def test_get_identity_follows_token_reassignment(self):
+        """Test that the identity is fetched again when the token is set directly."""
+        # Mock responses
+        self.mock_session.return_value.get.side_effect = [
+            _FakeResponse(dict(self.IDENTITY_DATA, first_name="Alice")),
+            _FakeResponse(dict(self.IDENTITY_DATA, first_name="Bob"))
+        ]
         
-        client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
-        transactions = client.get_transactions("acct_Ms99YLcC2LETpC4KKK7VcjPY")
+        client.token = "alice"
+        client.get_identity()
+        client.token = "bob"
+        identity = client.get_identity()
         
         # Assertions
-        self.assertEqual(transactions, self.transactions_data)
-        mock_session.return_value.get.assert_called_once_with(
+        self.assertEqual(identity["first_name"], "Bob")
+        self.mock_session.return_value.get.assert_called_with(
+            f"{self.base_url}/stet/identity",
+            headers={"Authorization": "bearer bob", "Content-Type": "application/json"}
+        )
+    
+    @unittest.skipIf(ijson is None, "ijson is not installed")
+    def test_get_transactions_stream(self):
+        """Test streaming transactions."""
+        # Mock response
+        mock_response = MagicMock(status_code=200)
+        mock_response.__enter__.return_value = mock_response
+        mock_response.raw = io.BytesIO(json.dumps(self.TRANSACTIONS_DATA, default=dict).encode())
+        self.mock_session.return_value.get.return_value = mock_response
+
+        client = self.client
+
+        transactions = client.get_transactions("acct_Ms99YLcC2LETpC4KKK7VcjPY", stream=True)
+
+        # Assertions
+        self.assertEqual(list(transactions), list(self.TRANSACTIONS_DATA))
+        self.mock_session.return_value.get.assert_called_once_with(
             f"{self.base_url}/stet/account/acct_Ms99YLcC2LETpC4KKK7VcjPY/transaction",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers=_EXPECTED_HEADERS,
+            stream=True
         )
     
-    @patch('requests.Session')
-    def test_data_collector(self, mock_session):
+    def test_data_collector(self):
         """Test the data collector."""
         # Mock responses
-        mock_responses = {
-            f"{self.base_url}/stet/identity": MagicMock(json=lambda: self.identity_data),
-            f"{self.base_url}/stet/account": MagicMock(json=lambda: self.accounts_data),
-            f"{self.base_url}/stet/account/acct_Ms99YLcC2LETpC4KKK7VcjPY/balance": MagicMock(json=lambda: self.balances_data),
-            f"{self.base_url}/stet/account/acct_ruguKBdKe3Tr3e3iLsPwieqB/balance": MagicMock(json=lambda: self.balances_data),
-            f"{self.base_url}/stet/account/acct_Ms99YLcC2LETpC4KKK7VcjPY/transaction": MagicMock(json=lambda: self.transactions_data),
-            f"{self.base_url}/stet/account/acct_ruguKBdKe3Tr3e3iLsPwieqB/transaction": MagicMock(json=lambda: self.transactions_data),
-        }
+        url_map = self._URL_MAP
         
         def side_effect(url, headers):
-            return mock_responses[url]
+            return url_map[url]
         
-        mock_session.return_value.get.side_effect = side_effect
+        self.mock_session.return_value.get.side_effect = side_effect
         
-        client = BankingAPIClient(self.base_url, self.username, self.password)
-        client.session = mock_session.return_value
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         collector = BankingDataCollector(client)
         data = collector.collect_all_data()
         
         # Assertions
-        self.assertEqual(data["identity"], self.identity_data)
+        self.assertEqual(data["identity"], self.IDENTITY_DATA)
         self.assertEqual(len(data["accounts"]), 2)
-        self.assertEqual(data["accounts"][0]["balances"], self.balances_data)
-        self.assertEqual(data["accounts"][0]["transactions"], self.transactions_data)
-        self.assertEqual(data["accounts"][1]["balances"], self.balances_data)
-        self.assertEqual(data["accounts"][1]["transactions"], self.transactions_data)
+        self.assertEqual(data["accounts"][0]["balances"], list(self.BALANCES_DATA))
+        self.assertEqual(data["accounts"][0]["transactions"], list(self.TRANSACTIONS_DATA))
+        self.assertEqual(data["accounts"][1]["balances"], list(self.BALANCES_DATA))
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        
+        # Every endpoint is requested exactly once, with the authentication headers
+        calls = self.mock_session.return_value.get.call_args_list
+        self.assertEqual(len(calls), len(self._URL_MAP))
+        self.assertEqual({c.args[0] for c in calls}, set(self._URL_MAP))
+        self.assertEqual(calls[-1].kwargs["headers"], _EXPECTED_HEADERS)
+    
+    def test_data_collector_bounds_threads(self):
+        """Test that the sync collector fetches account data from max_concurrency threads."""
+        # Mock responses
+        url_map = self._URL_MAP
+        threads = set()
+        
+        def side_effect(url, headers):
+            threads.add(threading.get_ident())
+            return url_map[url]
+        
+        self.mock_session.return_value.get.side_effect = side_effect
+        
+        collector = BankingDataCollector(self.client, max_concurrency=1)
+        data = collector.collect_all_data()
+        
+        # Assertions
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        # The calling thread fetches the identity and accounts, one worker the rest
+        self.assertEqual(len(threads), 2)
+    
+    def test_data_collector_threads_fit_connection_pool(self):
+        """Test that the sync collector uses no more threads than the session pools connections."""
+        # Mock responses
+        url_map = self._URL_MAP
+        self.mock_session.return_value.get.side_effect = lambda url, headers: url_map[url]
+        
+        collector = BankingDataCollector(self.client, max_concurrency=POOL_MAXSIZE + 1)
+        with patch("concurrent.futures.ThreadPoolExecutor",
+                   wraps=concurrent.futures.ThreadPoolExecutor) as mock_executor:
+            collector.collect_all_data()
+        
+        # Assertions
+        self.assertEqual(mock_executor.call_args.kwargs["max_workers"], POOL_MAXSIZE)
+
+
+class TestBankingAPIClientRetries(unittest.TestCase):
+    """Tests for the retries of the sync client against a local HTTP server."""
+    
+    def setUp(self):
+        """Start a server that answers every request with 503 Service Unavailable."""
+        requests_seen = self.requests_seen = []
+        
+        class _UnavailableHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_seen.append(self.path)
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    @patch("urllib3.util.retry.Retry.sleep")
+    def test_exhausted_retries_raise_http_error(self, mock_sleep):
+        """Test that a gateway error still raises an HTTPError once retries run out."""
+        with BankingAPIClient(self.base_url, "mdupuis", "111111") as client:
+            # The client only mounts its adapter for https
+            client.session.mount("http://", client.session.get_adapter("https://"))
+            client._store_token({"access_token": "fake-token-12345", "token_type": "bearer"})
+            
+            with self.assertRaises(requests.HTTPError) as cm:
+                client.get_identity()
+        
+        # Assertions
+        self.assertEqual(cm.exception.response.status_code, 503)
+        self.assertEqual(len(self.requests_seen), 4)
 
 
-# Patching the aiohttp.ClientSession methods directly for async tests
 class TestAsyncBankingAPIClient(unittest.IsolatedAsyncioTestCase):
     """Tests for the asynchronous BankingAPIClient class."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.base_url = "https://dsp2-technical-test.iliad78.net"
-        self.username = "agribard"
-        self.password = "222222"
-        
-        # Sample response data
-        self.token_data = {
-            "access_token": "fake-token-12345",
-            "token_type": "bearer"
-        }
-        self.identity_data = {
-            "id": "user456",
-            "prefix": "MIST",
-            "first_name": "Antoinette",
-            "last_name": "Gribard",
-            "date_of_birth": "1980-02-15"
-        }
-        self.accounts_data = [
-            {
-                "id": "acct_789",
-                "name": "Compte Professionnel",
-                "type": "CACC",
-                "usage": "PRIV",
-                "iban": "FR7610096000507890123456789",
-                "currency": "EUR"
-            },
-            {
-                "id": "acct_012",
-                "name": "Compte Épargne",
-                "type": "SVGS",
-                "usage": "PRIV",
-                "iban": "FR7610096000501234567890987",
-                "currency": "EUR"
-            }
-        ]
-        self.balances_data = [
-            {
-                "amount": 25000,
-                "currency": "EUR"
-            }
-        ]
-        self.transactions_data = [
-            {
-                "id": "tx789",
-                "amount": 200.00,
-                "currency": "EUR",
-                "description": "Rent",
-                "date": "2023-01-05T09:00:00Z"
-            },
-            {
-                "id": "tx012",
-                "amount": -75.50,
-                "currency": "EUR",
-                "description": "Restaurant",
-                "date": "2023-01-06T19:30:00Z"
-            }
-        ]
+    base_url = "https://dsp2-technical-test.iliad78.net"
+    username = "agribard"
+    password = "222222"
+    
+    # Sample response data, read-only so that no test can alter it for the others
+    TOKEN_DATA = MappingProxyType({
+        "access_token": "fake-token-12345",
+        "token_type": "bearer"
+    })
+    IDENTITY_DATA = MappingProxyType({
+        "id": "user456",
+        "prefix": "MIST",
+        "first_name": "Antoinette",
+        "last_name": "Gribard",
+        "date_of_birth": "1980-02-15"
+    })
+    ACCOUNTS_DATA = (
+        MappingProxyType({
+            "id": "acct_789",
+            "name": "Compte Professionnel",
+            "type": "CACC",
+            "usage": "PRIV",
+            "iban": "FR7610096000507890123456789",
+            "currency": "EUR"
+        }),
+        MappingProxyType({
+            "id": "acct_012",
+            "name": "Compte Épargne",
+            "type": "SVGS",
+            "usage": "PRIV",
+            "iban": "FR7610096000501234567890987",
+            "currency": "EUR"
+        })
+    )
+    BALANCES_DATA = (
+        MappingProxyType({
+            "amount": 25000,
+            "currency": "EUR"
+        }),
+    )
+    TRANSACTIONS_DATA = (
+        MappingProxyType({
+            "id": "tx789",
+            "amount": 200.00,
+            "currency": "EUR",
+            "description": "Rent",
+            "date": "2023-01-05T09:00:00Z"
+        }),
+        MappingProxyType({
+            "id": "tx012",
+            "amount": -75.50,
+            "currency": "EUR",
+            "description": "Restaurant",
+            "date": "2023-01-06T19:30:00Z"
+        })
+    )
+    
+    # Runner whose event loop is shared by the tests of the class, None when
+    # asyncio.Runner is not available (before Python 3.11)
+    _shared_runner = None
+    
+    @classmethod
+    def setUpClass(cls):
+        """Build the responses of the data collector tests and the event loop once for the class."""
+        super().setUpClass()
+        cls._URL_MAP = _build_url_map(cls.base_url, cls.IDENTITY_DATA, cls.ACCOUNTS_DATA,
+                                      cls.BALANCES_DATA, cls.TRANSACTIONS_DATA)
+        if hasattr(asyncio, "Runner"):
+            cls._shared_runner = asyncio.Runner(debug=True)
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared event loop."""
+        if cls._shared_runner is not None:
+            cls._shared_runner.close()
+            cls._shared_runner = None
+        super().tearDownClass()
+    
+    def _setupAsyncioRunner(self):
+        """Reuse the class-level asyncio.Runner so that the tests do not each create an event loop."""
+        if self._shared_runner is None:
+            super()._setupAsyncioRunner()
+        else:
+            self._asyncioRunner = self._shared_runner
+    
+    def _tearDownAsyncioRunner(self):
+        """Release the class-level asyncio.Runner without closing it, since the next test reuses it."""
+        if self._shared_runner is None:
+            super()._tearDownAsyncioRunner()
+        else:
+            # The loop is closed in tearDownClass
+            self._asyncioRunner = None
     
     async def asyncSetUp(self):
         """Set up async test fixtures."""
-        pass
+        self.client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
+        # Stand-in for the aiohttp session, its methods return _FakeResponse objects
+        self.client.session = MagicMock()
+        self.client._store_token(self.TOKEN_DATA)
     
-    @patch('aiohttp.ClientSession.post')
-    async def test_authenticate_async(self, mock_post):
+    async def test_authenticate_async(self):
         """Test async authentication."""
-        # Create a mock context manager response
-        cm_response = AsyncMock()
-        mock_response = cm_response.__aenter__.return_value
-        mock_response.json.return_value = self.token_data
-        mock_post.return_value = cm_response
-        
         client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
+        client.session = MagicMock()
+        mock_post = client.session.post
+        
+        # Mock response
+        mock_post.return_value = _FakeResponse(self.TOKEN_DATA)
         
         token = await client.authenticate_async()
         
@@ -300,174 +722,302 @@ class TestAsyncBankingAPIClient(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(token, "fake-token-12345")
         mock_post.assert_called_once_with(
             f"{self.base_url}/oauth/token",
-            data={"username": self.username, "password": self.password, "scope": "stet"},
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
+            data=f"username={self.username}&password={self.password}&scope=stet".encode(),
+            headers=_FORM_HEADERS
+        )
+    
+    @patch('aiohttp.ClientSession.head')
+    async def test_warm_up_async(self, mock_head):
+        """Test that the async client opens a connection when entering its context."""
+        mock_head.return_value = _FakeResponse()
+
+        async with BankingAPIClient(self.base_url, self.username, self.password,
+                                    use_async=True, warm_up=True):
+            pass
+
+        # Assertions
+        mock_head.assert_called_once()
+        self.assertEqual(mock_head.call_args.args, (f"{self.base_url}/",))
+        self.assertFalse(mock_head.call_args.kwargs["allow_redirects"])
+        self.assertEqual(mock_head.call_args.kwargs["timeout"].total, WARM_UP_TIMEOUT)
+
+    @patch('aiohttp.ClientSession.head')
+    async def test_warm_up_async_ignores_timeout(self, mock_head):
+        """Test that a warm-up request timing out does not prevent entering the context."""
+        mock_head.side_effect = asyncio.TimeoutError()
+
+        async with BankingAPIClient(self.base_url, self.username, self.password,
+                                    use_async=True, warm_up=True) as client:
+            # Assertions
+            self.assertFalse(client.session.closed)
+
+    @patch('aiohttp.ClientSession.head')
+    async def test_warm_up_async_failure_closes_session(self, mock_head):
+        """Test that the session is closed when the warm-up fails unexpectedly."""
+        mock_head.side_effect = RuntimeError("boom")
+
+        client = BankingAPIClient(self.base_url, self.username, self.password,
+                                  use_async=True, warm_up=True)
+        with self.assertRaises(RuntimeError):
+            async with client:
+                pass
+
+        # Assertions
+        self.assertTrue(client.session.closed)
+
+    async def test_get_reauthenticates_on_401_async(self):
+        """Test that a rejected token is refreshed and the request retried asynchronously."""
+        # Mock responses
+        self.client.session.post.return_value = _FakeResponse(
+            {"access_token": "new-token", "token_type": "bearer"}
+        )
+        mock_get = self.client.session.get
+        mock_get.side_effect = [
+            _FakeResponse(status=401),
+            _FakeResponse(self.IDENTITY_DATA)
+        ]
+        
+        identity = await self.client.get_identity_async()
+        
+        # Assertions
+        self.assertEqual(identity, self.IDENTITY_DATA)
+        self.client.session.post.assert_called_once()
+        mock_get.assert_called_with(
+            f"{self.base_url}/stet/identity",
+            headers={"Authorization": "bearer new-token", "Content-Type": "application/json"}
         )
+    
+    async def test_concurrent_401s_share_one_token_request_async(self):
+        """Test that requests rejected together trigger a single token request asynchronously."""
+        # Mock responses
+        self.client.session.post.return_value = _TrackedResponse(
+            _FakeResponse({"access_token": "new-token", "token_type": "bearer"})
+        )
+        url_map = self._URL_MAP
+        
+        def side_effect(url, headers):
+            if headers == _EXPECTED_HEADERS and "/stet/account/" in url:
+                return _TrackedResponse(_FakeResponse(status=401))
+            return url_map[url]
+        
+        self.client.session.get.side_effect = side_effect
+        
+        collector = BankingDataCollector(self.client)
+        data = await collector.collect_all_data_async()
         
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
+        # Assertions
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        self.client.session.post.assert_called_once()
+        self.assertEqual(self.client.token, "new-token")
     
-    @patch('aiohttp.ClientSession.get')
-    async def test_get_identity_async(self, mock_get):
+    async def test_get_identity_async(self):
         """Test getting identity asynchronously."""
-        # Create a mock context manager response
-        cm_response = AsyncMock()
-        mock_response = cm_response.__aenter__.return_value
-        mock_response.json.return_value = self.identity_data
-        mock_get.return_value = cm_response
+        # Mock response
+        mock_get = self.client.session.get
+        mock_get.return_value = _FakeResponse(self.IDENTITY_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         identity = await client.get_identity_async()
         
         # Assertions
-        self.assertEqual(identity, self.identity_data)
+        self.assertEqual(identity, self.IDENTITY_DATA)
         mock_get.assert_called_once_with(
             f"{self.base_url}/stet/identity",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers=_EXPECTED_HEADERS
         )
-        
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
     
-    @patch('aiohttp.ClientSession.get')
-    async def test_get_accounts_async(self, mock_get):
+    async def test_get_accounts_async(self):
         """Test getting accounts asynchronously."""
-        # Create a mock context manager response
-        cm_response = AsyncMock()
-        mock_response = cm_response.__aenter__.return_value
-        mock_response.json.return_value = self.accounts_data
-        mock_get.return_value = cm_response
+        # Mock response
+        mock_get = self.client.session.get
+        mock_get.return_value = _FakeResponse(self.ACCOUNTS_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         accounts = await client.get_accounts_async()
         
         # Assertions
-        self.assertEqual(accounts, self.accounts_data)
+        self.assertEqual(accounts, list(self.ACCOUNTS_DATA))
         mock_get.assert_called_once_with(
             f"{self.base_url}/stet/account",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers=_EXPECTED_HEADERS
         )
-        
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
     
-    @patch('aiohttp.ClientSession.get')
-    async def test_get_balances_async(self, mock_get):
+    async def test_get_balances_async(self):
         """Test getting balances asynchronously."""
-        # Create a mock context manager response
-        cm_response = AsyncMock()
-        mock_response = cm_response.__aenter__.return_value
-        mock_response.json.return_value = self.balances_data
-        mock_get.return_value = cm_response
+        # Mock response
+        mock_get = self.client.session.get
+        mock_get.return_value = _FakeResponse(self.BALANCES_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         balances = await client.get_balances_async("acct_789")
         
         # Assertions
-        self.assertEqual(balances, self.balances_data)
+        self.assertEqual(balances, list(self.BALANCES_DATA))
         mock_get.assert_called_once_with(
             f"{self.base_url}/stet/account/acct_789/balance",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers=_EXPECTED_HEADERS
         )
-        
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
     
-    @patch('aiohttp.ClientSession.get')
-    async def test_get_transactions_async(self, mock_get):
+    async def test_get_transactions_async(self):
         """Test getting transactions asynchronously."""
-        # Create a mock context manager response
-        cm_response = AsyncMock()
-        mock_response = cm_response.__aenter__.return_value
-        mock_response.json.return_value = self.transactions_data
-        mock_get.return_value = cm_response
+        # Mock response
+        mock_get = self.client.session.get
+        mock_get.return_value = _FakeResponse(self.TRANSACTIONS_DATA)
         
-        client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         transactions = await client.get_transactions_async("acct_789")
         
         # Assertions
-        self.assertEqual(transactions, self.transactions_data)
+        self.assertEqual(transactions, list(self.TRANSACTIONS_DATA))
         mock_get.assert_called_once_with(
             f"{self.base_url}/stet/account/acct_789/transaction",
-            headers={"Authorization": "bearer fake-token-12345", "Content-Type": "application/json"}
+            headers=_EXPECTED_HEADERS
         )
+
+    @unittest.skipIf(ijson is None, "ijson is not installed")
+    async def test_get_transactions_async_stream(self):
+        """Test streaming transactions asynchronously."""
+        mock_get = self.client.session.get
         
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
+        # Create a mock context manager response
+        cm_response = AsyncMock()
+        mock_response = cm_response.__aenter__.return_value
+        mock_response.status = 200
+        body = io.BytesIO(json.dumps(self.TRANSACTIONS_DATA, default=dict).encode())
+        mock_response.content.read.side_effect = body.read
+        mock_get.return_value = cm_response
+
+        client = self.client
+
+        transactions = await client.get_transactions_async("acct_789", stream=True)
+
+        # Assertions
+        self.assertEqual([tx async for tx in transactions], list(self.TRANSACTIONS_DATA))
+        mock_get.assert_called_once_with(
+            f"{self.base_url}/stet/account/acct_789/transaction",
+            headers=_EXPECTED_HEADERS
+        )
     
-    @patch('aiohttp.ClientSession.get')
-    async def test_data_collector_async(self, mock_get):
+    async def test_data_collector_async(self):
         """Test the data collector asynchronously."""
-        # We need to patch multiple calls to the same method but with different responses
-        # First, create the mock responses
-        identity_response = AsyncMock()
-        identity_response.__aenter__.return_value.json.return_value = self.identity_data
-        
-        accounts_response = AsyncMock()
-        accounts_response.__aenter__.return_value.json.return_value = self.accounts_data
+        mock_get = self.client.session.get
         
-        balances_response = AsyncMock()
-        balances_response.__aenter__.return_value.json.return_value = self.balances_data
-        
-        transactions_response = AsyncMock()
-        transactions_response.__aenter__.return_value.json.return_value = self.transactions_data
+        # Record when each request starts and when its response is released
+        events = []
         
         # Set up the side effect to return different responses based on the URL
+        url_map = self._URL_MAP
+        
         def side_effect(url, headers):
-            if url == f"{self.base_url}/stet/identity":
-                return identity_response
-            elif url == f"{self.base_url}/stet/account":
-                return accounts_response
-            elif "/balance" in url:
-                return balances_response
-            elif "/transaction" in url:
-                return transactions_response
-            else:
-                raise ValueError(f"Unexpected URL: {url}")
+            return _TrackedResponse(url_map[url], url, events)
         
         mock_get.side_effect = side_effect
         
-        client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
-        client.session = aiohttp.ClientSession()
-        client.token = "fake-token-12345"
-        client.token_type = "bearer"
+        client = self.client
         
         collector = BankingDataCollector(client)
         data = await collector.collect_all_data_async()
         
         # Assertions
-        self.assertEqual(data["identity"], self.identity_data)
+        self.assertEqual(data["identity"], self.IDENTITY_DATA)
         self.assertEqual(len(data["accounts"]), 2)
-        self.assertEqual(data["accounts"][0]["balances"], self.balances_data)
-        self.assertEqual(data["accounts"][0]["transactions"], self.transactions_data)
-        self.assertEqual(data["accounts"][1]["balances"], self.balances_data)
-        self.assertEqual(data["accounts"][1]["transactions"], self.transactions_data)
+        self.assertEqual(data["accounts"][0]["balances"], list(self.BALANCES_DATA))
+        self.assertEqual(data["accounts"][0]["transactions"], list(self.TRANSACTIONS_DATA))
+        self.assertEqual(data["accounts"][1]["balances"], list(self.BALANCES_DATA))
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        
+        # Every endpoint is requested exactly once, with the authentication headers
+        calls = mock_get.call_args_list
+        self.assertEqual(len(calls), len(self._URL_MAP))
+        self.assertEqual({c.args[0] for c in calls}, set(self._URL_MAP))
+        self.assertEqual(calls[-1].kwargs["headers"], _EXPECTED_HEADERS)
+        
+        # The second account must be requested before the first one completes
+        second_balance_start = events.index(("start", f"{self.base_url}/stet/account/acct_012/balance"))
+        first_transactions_end = events.index(("end", f"{self.base_url}/stet/account/acct_789/transaction"))
+        self.assertLess(second_balance_start, first_transactions_end)
+    
+    async def test_data_collector_async_bounds_concurrency(self):
+        """Test that the async collector keeps at most max_concurrency account requests in flight."""
+        events = []
+        url_map = self._URL_MAP
+        self.client.session.get.side_effect = lambda url, headers: _TrackedResponse(url_map[url], url, events)
+        
+        collector = BankingDataCollector(self.client, max_concurrency=2)
+        data = await collector.collect_all_data_async()
+        
+        # Count the requests in flight after each start or end event
+        in_flight = 0
+        max_in_flight = 0
+        for kind, _ in events:
+            in_flight += 1 if kind == "start" else -1
+            max_in_flight = max(max_in_flight, in_flight)
         
-        # Clean up
-        if client.session and not client.session.closed:
-            await client.session.close()
+        # Assertions
+        self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+        self.assertEqual(max_in_flight, 2)
+
+
+class TestAsyncBankingDataCollectorEventLoops(unittest.TestCase):
+    """Tests for running the async data collector in successive event loops."""
+    
+    # Same fixtures as the other async tests, each test runs its own event loops
+    base_url = TestAsyncBankingAPIClient.base_url
+    username = TestAsyncBankingAPIClient.username
+    password = TestAsyncBankingAPIClient.password
+    TOKEN_DATA = TestAsyncBankingAPIClient.TOKEN_DATA
+    TRANSACTIONS_DATA = TestAsyncBankingAPIClient.TRANSACTIONS_DATA
+    
+    @classmethod
+    def setUpClass(cls):
+        """Build the responses of the data collector tests once for the class."""
+        super().setUpClass()
+        fixtures = TestAsyncBankingAPIClient
+        cls._URL_MAP = _build_url_map(cls.base_url, fixtures.IDENTITY_DATA, fixtures.ACCOUNTS_DATA,
+                                      fixtures.BALANCES_DATA, cls.TRANSACTIONS_DATA)
+    
+    def setUp(self):
+        """Set up an async client with a stand-in session."""
+        self.client = BankingAPIClient(self.base_url, self.username, self.password, use_async=True)
+        self.client.session = MagicMock()
+    
+    def test_async_data_collector_reused_across_event_loops(self):
+        """Test that an async collector can run in successive event loops."""
+        client = self.client
+        client.session.post.return_value = _TrackedResponse(
+            _FakeResponse({"access_token": "new-token", "token_type": "bearer"})
+        )
+        url_map = self._URL_MAP
+        
+        # The account requests sent with the old token are rejected together
+        def side_effect(url, headers):
+            if headers == _EXPECTED_HEADERS and "/stet/account/" in url:
+                return _TrackedResponse(_FakeResponse(status=401))
+            return _TrackedResponse(url_map[url])
+        
+        client.session.get.side_effect = side_effect
+        
+        # Two slots make the account requests wait on the semaphore and
+        # the rejected ones wait on the re-authentication lock
+        collector = BankingDataCollector(client, max_concurrency=2)
+        for _ in range(2):
+            client._store_token(self.TOKEN_DATA)
+            data = asyncio.run(collector.collect_all_data_async())
+            
+            # Assertions
+            self.assertEqual(data["accounts"][1]["transactions"], list(self.TRANSACTIONS_DATA))
+            self.assertEqual(client.token, "new-token")
+        self.assertEqual(client.session.post.call_count, 2)
 
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    # Spread the tests over all cores when pytest-xdist is available
+    if importlib.util.find_spec("xdist") is None:
+        unittest.main()
+    else:
+        import pytest
+        sys.exit(pytest.main(["-n", "auto", __file__]))
\ No newline at end of file